@@ -2,13 +2,13 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta, date
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import io
+import functools
 import re
 import sqlite3
 import os
+import threading
+import time
+from contextlib import contextmanager
 
 # Configuração da página
 st.set_page_config(
@@ -20,10 +20,132 @@ st.set_page_config(
 
 # Configuração do banco de dados
 DB_FILE = "rate_shopper.db"
+DB_PAGE_SIZE = 4096
+
+# PRAGMAs aplicados uma única vez, na criação da conexão compartilhada
+DB_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA busy_timeout=60000",
+)
+
+# Índices das consultas por hotel; o de tarifas é recriado em importações grandes
+INDICE_TARIFAS_HOTEL_DATA = "CREATE INDEX IF NOT EXISTS idx_tarifas_hotel_data ON tarifas(hotel, data)"
+INDICES = (
+    INDICE_TARIFAS_HOTEL_DATA,
+    "CREATE INDEX IF NOT EXISTS idx_rel_principal ON relacionamentos(hotel_principal)",
+    "CREATE INDEX IF NOT EXISTS idx_importacoes_hotel ON importacoes(hotel)",
+)
+
+# A partir deste volume é mais barato recriar o índice do que mantê-lo linha a linha
+LIMITE_RECRIAR_INDICE = 10000
+
+# Linhas por comando INSERT na importação (4 parâmetros por linha, bem abaixo do limite do SQLite)
+LINHAS_POR_INSERT = 500
+
+# Combinações (hotel, período, versão das tarifas) mantidas nos caches da matriz e do gráfico
+MAX_ENTRADAS_CACHE_MATRIZ = 32
+
+# Quantidade de tarifas exibidas por página na visualização e na exclusão individual
+TARIFAS_POR_PAGINA = 500
+TARIFAS_POR_PAGINA_EXCLUSAO = 200
+
+@st.cache_resource
+def obter_conexao():
+    """Retorna a conexão SQLite compartilhada por todas as execuções do app"""
+    # cached_statements: mantém os comandos preparados das consultas repetidas a cada rerun
+    conn = sqlite3.connect(DB_FILE, check_same_thread=False, isolation_level=None, cached_statements=256)
+    conn.row_factory = sqlite3.Row
+    for pragma in DB_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+@st.cache_resource
+def obter_conexao_leitura():
+    """Retorna a conexão SQLite somente leitura usada pelas consultas"""
+    # Separada da conexão de escrita: em WAL cada leitura só enxerga transações já confirmadas,
+    # nunca um DELETE/INSERT ainda aberto por outra sessão em transacao()
+    conn = sqlite3.connect(f"file:{DB_FILE}?mode=ro", uri=True, check_same_thread=False, isolation_level=None, cached_statements=256)
+    conn.row_factory = sqlite3.Row
+    for pragma in DB_PRAGMAS:
+        # journal_mode é do arquivo e já foi definido pela conexão de escrita
+        if not pragma.startswith("PRAGMA journal_mode"):
+            conn.execute(pragma)
+    return conn
+
+@st.cache_resource
+def obter_lock():
+    """Lock que serializa as escritas na conexão compartilhada entre sessões"""
+    return threading.Lock()
+
+@contextmanager
+def transacao():
+    """Agrupa as escritas do bloco em uma única transação protegida pelo lock"""
+    conn = obter_conexao()
+    with obter_lock():
+        conn.execute("BEGIN")
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+# Tabela de tarifas; o CHECK garante a data sempre como texto ISO (AAAA-MM-DD)
+DDL_TARIFAS = '''
+    CREATE TABLE IF NOT EXISTS tarifas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        hotel TEXT NOT NULL,
+        data DATE NOT NULL CHECK (data GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'),
+        preco REAL NOT NULL,
+        sequencia INTEGER DEFAULT 1,
+        importacao_id INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (hotel) REFERENCES hoteis (nome),
+        FOREIGN KEY (importacao_id) REFERENCES importacoes (id)
+    )
+'''
+
+def migrar_tabela_tarifas():
+    """Recria a tabela de tarifas de bancos antigos com o CHECK da data, padronizando as datas gravadas"""
+    with transacao() as conn:
+        # Datas fora do padrão ISO (ex.: '2025-1-5', '2025-01-05 00:00:00') são convertidas;
+        # as que não representam data alguma (ex.: 'NaT') não têm como ser mantidas e são removidas
+        fora_do_padrao = conn.execute(
+            "SELECT id, data FROM tarifas WHERE data NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'"
+        ).fetchall()
+        if fora_do_padrao:
+            ids = np.array([row[0] for row in fora_do_padrao])
+            datas = pd.to_datetime(pd.Series([str(row[1]) for row in fora_do_padrao]), format='ISO8601', errors='coerce')
+            validas = datas.notna().to_numpy()
+            conn.executemany("UPDATE tarifas SET data = ? WHERE id = ?",
+                             zip(datas[validas].dt.strftime('%Y-%m-%d'), ids[validas].tolist()))
+            conn.executemany("DELETE FROM tarifas WHERE id = ?", [(tarifa_id,) for tarifa_id in ids[~validas].tolist()])
+        
+        # Tabela nova com a restrição; o índice acompanha a antiga e é recriado em init_database
+        conn.execute("ALTER TABLE tarifas RENAME TO tarifas_sem_check")
+        conn.execute(DDL_TARIFAS)
+        conn.execute("""
+            INSERT INTO tarifas (id, hotel, data, preco, sequencia, importacao_id, created_at)
+            SELECT id, hotel, data, preco, sequencia, importacao_id, created_at FROM tarifas_sem_check
+        """)
+        conn.execute("DROP TABLE tarifas_sem_check")
 
 def init_database():
     """Inicializa o banco de dados SQLite com as tabelas necessárias"""
-    conn = sqlite3.connect(DB_FILE)
+    conn = obter_conexao()
+    
+    # page_size precisa ser definido antes das tabelas; bancos antigos são reescritos
+    # uma vez via VACUUM fora do modo WAL (em WAL o tamanho de página não muda)
+    if conn.execute("PRAGMA page_size").fetchone()[0] != DB_PAGE_SIZE:
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.execute(f"PRAGMA page_size={DB_PAGE_SIZE}")
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA journal_mode=WAL")
+    
     cursor = conn.cursor()
     
     # Tabela de hotéis
@@ -61,201 +183,349 @@ def init_database():
     ''')
     
     # Tabela de tarifas (com referência à importação)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS tarifas (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            hotel TEXT NOT NULL,
-            data DATE NOT NULL,
-            preco REAL NOT NULL,
-            sequencia INTEGER DEFAULT 1,
-            importacao_id INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (hotel) REFERENCES hoteis (nome),
-            FOREIGN KEY (importacao_id) REFERENCES importacoes (id)
-        )
-    ''')
+    cursor.execute(DDL_TARIFAS)
     
-    conn.commit()
-    conn.close()
+    # Bancos criados antes do CHECK da data são migrados para a tabela com a restrição
+    sql_tarifas = cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'tarifas'").fetchone()[0]
+    if "CHECK" not in sql_tarifas:
+        migrar_tabela_tarifas()
+    
+    # Índices criados após as tabelas
+    for indice in INDICES:
+        cursor.execute(indice)
 
 # CRUD para Hotéis
 def criar_hotel(nome, booking_url=""):
     """Cria um novo hotel no banco"""
     try:
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO hoteis (nome, booking_url) VALUES (?, ?)", (nome, booking_url))
-        conn.commit()
-        conn.close()
+        with obter_lock():
+            obter_conexao().execute("INSERT INTO hoteis (nome, booking_url) VALUES (?, ?)", (nome, booking_url))
+        listar_hoteis_completo.clear()
+        listar_hoteis_nomes.clear()
         return True
     except sqlite3.IntegrityError:
         return False
 
-def listar_hoteis():
-    """Lista todos os hotéis"""
-    conn = sqlite3.connect(DB_FILE)
-    df = pd.read_sql_query("SELECT * FROM hoteis ORDER BY nome", conn)
-    conn.close()
-    return df
+@st.cache_data(ttl=60)
+def listar_hoteis_completo():
+    """Lista todos os hotéis com nome e link do Booking"""
+    return pd.read_sql_query("SELECT nome, booking_url FROM hoteis ORDER BY nome", obter_conexao_leitura())
+
+@st.cache_data(ttl=60)
+def listar_hoteis_nomes():
+    """Lista apenas os nomes dos hotéis, em ordem alfabética"""
+    return tuple(row[0] for row in obter_conexao_leitura().execute("SELECT nome FROM hoteis ORDER BY nome"))
 
 def atualizar_hotel(nome_antigo, nome_novo, booking_url):
     """Atualiza dados de um hotel"""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("UPDATE hoteis SET nome = ?, booking_url = ? WHERE nome = ?", 
-                   (nome_novo, booking_url, nome_antigo))
-    conn.commit()
-    conn.close()
+    with obter_lock():
+        obter_conexao().execute("UPDATE hoteis SET nome = ?, booking_url = ? WHERE nome = ?", 
+                                (nome_novo, booking_url, nome_antigo))
+    listar_hoteis_completo.clear()
+    listar_hoteis_nomes.clear()
 
 def excluir_hotel(nome):
     """Exclui um hotel e todos os dados relacionados"""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM tarifas WHERE hotel = ?", (nome,))
-    cursor.execute("DELETE FROM relacionamentos WHERE hotel_principal = ? OR concorrente = ?", (nome, nome))
-    cursor.execute("DELETE FROM importacoes WHERE hotel = ?", (nome,))
-    cursor.execute("DELETE FROM hoteis WHERE nome = ?", (nome,))
-    conn.commit()
-    conn.close()
+    with transacao() as conn:
+        conn.execute("DELETE FROM tarifas WHERE hotel = ?1", (nome,))
+        conn.execute("DELETE FROM relacionamentos WHERE hotel_principal = ?1 OR concorrente = ?1", (nome,))
+        conn.execute("DELETE FROM importacoes WHERE hotel = ?1", (nome,))
+        conn.execute("DELETE FROM hoteis WHERE nome = ?1", (nome,))
+    listar_hoteis_completo.clear()
+    listar_hoteis_nomes.clear()
+    listar_relacionamentos.clear()
+    obter_concorrentes.clear()
+    listar_importacoes.clear()
+    listar_tarifas_por_hotel.clear()
+    carregar_tarifas.clear()
 
 # CRUD para Relacionamentos
-def criar_relacionamento(hotel_principal, concorrente):
-    """Cria um relacionamento entre hotéis"""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO relacionamentos (hotel_principal, concorrente) VALUES (?, ?)", 
-                   (hotel_principal, concorrente))
-    conn.commit()
-    conn.close()
-
+@st.cache_data(ttl=60)
 def listar_relacionamentos():
     """Lista todos os relacionamentos"""
-    conn = sqlite3.connect(DB_FILE)
-    df = pd.read_sql_query("""
+    return pd.read_sql_query("""
         SELECT hotel_principal, GROUP_CONCAT(concorrente, ', ') as concorrentes
         FROM relacionamentos 
         GROUP BY hotel_principal
         ORDER BY hotel_principal
-    """, conn)
-    conn.close()
-    return df
+    """, obter_conexao_leitura())
 
-def excluir_relacionamentos(hotel_principal):
-    """Exclui todos os relacionamentos de um hotel"""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM relacionamentos WHERE hotel_principal = ?", (hotel_principal,))
-    conn.commit()
-    conn.close()
+def salvar_relacionamentos(hotel_principal, concorrentes):
+    """Substitui os concorrentes de um hotel em uma única transação (lista vazia remove todos)"""
+    with transacao() as conn:
+        conn.execute("DELETE FROM relacionamentos WHERE hotel_principal = ?", (hotel_principal,))
+        conn.executemany("INSERT INTO relacionamentos (hotel_principal, concorrente) VALUES (?, ?)",
+                         [(hotel_principal, concorrente) for concorrente in concorrentes])
+    listar_relacionamentos.clear()
+    obter_concorrentes.clear()
 
+@st.cache_data(ttl=60)
 def obter_concorrentes(hotel_principal):
-    """Obtém lista de concorrentes de um hotel"""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("SELECT concorrente FROM relacionamentos WHERE hotel_principal = ?", (hotel_principal,))
-    concorrentes = [row[0] for row in cursor.fetchall()]
-    conn.close()
-    return concorrentes
+    """Obtém o conjunto de concorrentes de um hotel"""
+    return {row[0] for row in obter_conexao_leitura().execute("SELECT concorrente FROM relacionamentos WHERE hotel_principal = ?", (hotel_principal,))}
 
 # CRUD para Importações
 def criar_importacao(titulo, hotel, total_registros):
     """Cria uma nova importação"""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO importacoes (titulo, hotel, total_registros) VALUES (?, ?, ?)", 
-                   (titulo, hotel, total_registros))
-    importacao_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    return importacao_id
+    with obter_lock():
+        cursor = obter_conexao().execute("INSERT INTO importacoes (titulo, hotel, total_registros) VALUES (?, ?, ?)", 
+                                         (titulo, hotel, total_registros))
+    listar_importacoes.clear()
+    return cursor.lastrowid
 
+@st.cache_data(ttl=60)
 def listar_importacoes():
     """Lista todas as importações"""
-    conn = sqlite3.connect(DB_FILE)
-    df = pd.read_sql_query("""
+    return pd.read_sql_query("""
         SELECT id, titulo, hotel, data_importacao, total_registros
         FROM importacoes 
         ORDER BY data_importacao DESC
-    """, conn)
-    conn.close()
-    return df
+    """, obter_conexao_leitura())
 
 def excluir_importacao(importacao_id):
     """Exclui uma importação e todas as tarifas relacionadas"""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    
-    # Primeiro, obter informações da importação para identificar as tarifas relacionadas
-    cursor.execute("SELECT hotel, titulo FROM importacoes WHERE id = ?", (importacao_id,))
-    importacao_info = cursor.fetchone()
-    
-    if importacao_info:
-        hotel, titulo = importacao_info
-        # Como não temos importacao_id na tabela tarifas, vamos excluir apenas a importação
-        # As tarifas ficam no sistema (não há como identificar quais pertencem a esta importação específica)
-        cursor.execute("DELETE FROM importacoes WHERE id = ?", (importacao_id,))
-    
-    conn.commit()
-    conn.close()
+    conn = obter_conexao()
+    with obter_lock():
+        # Primeiro, obter informações da importação para identificar as tarifas relacionadas
+        importacao_info = conn.execute("SELECT hotel, titulo FROM importacoes WHERE id = ?", (importacao_id,)).fetchone()
+        
+        if importacao_info:
+            hotel, titulo = importacao_info
+            # Como não temos importacao_id na tabela tarifas, vamos excluir apenas a importação
+            # As tarifas ficam no sistema (não há como identificar quais pertencem a esta importação específica)
+            conn.execute("DELETE FROM importacoes WHERE id = ?", (importacao_id,))
+    listar_importacoes.clear()
 
 # CRUD para Tarifas
+def normalizar_data(data):
+    """Converte uma data para o texto ISO (AAAA-MM-DD) gravado em tarifas.data"""
+    return pd.Timestamp(data).strftime('%Y-%m-%d')
+
 def criar_tarifa(hotel, data, preco, sequencia):
     """Cria uma nova tarifa"""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO tarifas (hotel, data, preco, sequencia) VALUES (?, ?, ?, ?)",
-                   (hotel, data, preco, sequencia))
-    conn.commit()
-    conn.close()
+    with obter_lock():
+        obter_conexao().execute("INSERT INTO tarifas (hotel, data, preco, sequencia) VALUES (?, ?, ?, ?)",
+                                (hotel, normalizar_data(data), preco, sequencia))
+    listar_tarifas_por_hotel.clear()
+    carregar_tarifas.clear()
 
-def listar_tarifas():
-    """Lista todas as tarifas"""
-    conn = sqlite3.connect(DB_FILE)
-    df = pd.read_sql_query("""
+def listar_tarifas(limite=-1, offset=0):
+    """Lista todas as tarifas (limite=-1 retorna todas)"""
+    return pd.read_sql_query("""
         SELECT id, hotel, data, preco, sequencia, created_at
         FROM tarifas 
         ORDER BY hotel, data, sequencia
-    """, conn)
-    conn.close()
-    return df
+        LIMIT ? OFFSET ?
+    """, obter_conexao_leitura(), params=(limite, offset))
 
-def listar_tarifas_por_hotel(hotel):
-    """Lista tarifas de um hotel específico"""
-    conn = sqlite3.connect(DB_FILE)
-    df = pd.read_sql_query("""
+@st.cache_data(ttl=60)
+def listar_tarifas_por_hotel(hotel, limite=-1, offset=0):
+    """Lista tarifas de um hotel específico (limite=-1 retorna todas)"""
+    return pd.read_sql_query("""
         SELECT id, hotel, data, preco, sequencia, created_at
         FROM tarifas 
         WHERE hotel = ? 
         ORDER BY data, sequencia
-    """, conn, params=(hotel,))
-    conn.close()
-    return df
+        LIMIT ? OFFSET ?
+    """, obter_conexao_leitura(), params=(hotel, limite, offset))
+
+def estatisticas_tarifas(hotel=None):
+    """Retorna (total, preço médio, menor preço, maior preço) calculados no banco"""
+    query = "SELECT COUNT(*), AVG(preco), MIN(preco), MAX(preco) FROM tarifas"
+    if hotel:
+        return obter_conexao_leitura().execute(query + " WHERE hotel = ?", (hotel,)).fetchone()
+    return obter_conexao_leitura().execute(query).fetchone()
 
 def excluir_tarifa(tarifa_id):
     """Exclui uma tarifa específica"""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM tarifas WHERE id = ?", (tarifa_id,))
-    conn.commit()
-    conn.close()
+    with obter_lock():
+        obter_conexao().execute("DELETE FROM tarifas WHERE id = ?", (tarifa_id,))
+    listar_tarifas_por_hotel.clear()
+    carregar_tarifas.clear()
+
+def excluir_todas_tarifas():
+    """Exclui todas as tarifas do sistema"""
+    with obter_lock():
+        obter_conexao().execute("DELETE FROM tarifas")
+    listar_tarifas_por_hotel.clear()
+    carregar_tarifas.clear()
 
-def importar_tarifas_excel(hotel, df_excel, titulo_importacao):
-    """Importa tarifas de um DataFrame do Excel"""
+def importar_tarifas_excel(hotel, datas, precos, sequencias, titulo_importacao):
+    """Importa tarifas do Excel a partir dos arrays de datas, preços e sequências"""
     # Inserir tarifas diretamente (sem sistema de importações por enquanto)
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
+    datas, precos, sequencias = (np.asarray(valores).tolist() for valores in (datas, precos, sequencias))
+    total = len(datas)
+    recriar_indice = total > LIMITE_RECRIAR_INDICE
+    
+    with transacao() as conn:
+        if recriar_indice:
+            conn.execute("DROP INDEX IF EXISTS idx_tarifas_hotel_data")
+        # INSERTs com várias linhas por comando, todos na mesma transação da troca do índice
+        for inicio in range(0, total, LINHAS_POR_INSERT):
+            fim = inicio + LINHAS_POR_INSERT
+            parametros = [valor for linha in zip(datas[inicio:fim], precos[inicio:fim], sequencias[inicio:fim])
+                          for valor in (hotel, *linha)]
+            valores_sql = ", ".join(["(?, ?, ?, ?)"] * (len(parametros) // 4))
+            conn.execute(f"INSERT INTO tarifas (hotel, data, preco, sequencia) VALUES {valores_sql}", parametros)
+        if recriar_indice:
+            conn.execute(INDICE_TARIFAS_HOTEL_DATA)
+            conn.execute("ANALYZE")
+    listar_tarifas_por_hotel.clear()
+    carregar_tarifas.clear()
+    return total  # Retorna quantidade de tarifas importadas
+
+# Matriz Comparativa
+# Estilo das células de preço por classe: 0 neutro, 1 ameaça, 2 seguro, 3 sem preço do hotel principal,
+# 4 hotel principal, 5 sem tarifa
+ESTILOS_CELULA_MATRIZ = np.array([
+    "border: 1px solid #ddd; padding: 8px; text-align: center; background-color: #F5F5F5; color: #424242; font-weight: bold;",  # Cinza - NEUTRO
+    "border: 1px solid #ddd; padding: 8px; text-align: center; background-color: #FFCDD2; color: #B71C1C; font-weight: bold;",  # Vermelho - AMEAÇA
+    "border: 1px solid #ddd; padding: 8px; text-align: center; background-color: #C8E6C9; color: #1B5E20; font-weight: bold;",  # Verde - SEGURO
+    "border: 1px solid #ddd; padding: 8px; text-align: center;",
+    "border: 1px solid #ddd; padding: 8px; text-align: center; background-color: #FFF2CC; font-weight: bold; color: #B7950B;",  # Amarelo
+    "border: 1px solid #ddd; padding: 8px; text-align: center; color: #999;",
+], dtype=object)
+
+@st.cache_data(ttl=60)
+def carregar_tarifas():
+    """Carrega as tarifas da matriz, ordenadas por data e com as datas em datetime64, junto com a versão da carga"""
+    df = pd.read_sql_query("SELECT hotel, data, preco FROM tarifas ORDER BY data, hotel, sequencia", obter_conexao_leitura())
+    df['_data_ts'] = pd.to_datetime(df['data'], format='ISO8601')
+    # A ordem cronológica permite recortar o período com busca binária; ordenar pelo datetime64
+    # não depende do formato do texto gravado (a ordem do SQL já deixa quase tudo no lugar)
+    df = df.sort_values('_data_ts', kind='stable', ignore_index=True)
+    # Poucos hotéis distintos: como categoria, filtros e agrupamentos comparam códigos inteiros
+    df['hotel'] = df['hotel'].astype('category')
+    # Preços em float32 (4 bytes) bastam para valores em reais com centavos e reduzem a cópia do cache
+    df['preco'] = df['preco'].astype('float32')
+    # Versão desta carga: muda a cada recarga (ttl ou clear() nas escritas) e identifica o conteúdo nas chaves de cache
+    return df, time.time_ns()
+
+@functools.lru_cache(maxsize=None)
+def carregar_plotly():
+    """Importa o Plotly apenas quando a Matriz Comparativa é aberta; retorna o módulo de gráficos e a paleta padrão"""
+    import plotly.graph_objects as go
+    from plotly.colors import qualitative
+    return go, qualitative.Plotly
+
+def classificar_precos(mn, indice_principal):
+    """Classifica cada célula da matriz de menores preços nas classes de ESTILOS_CELULA_MATRIZ"""
+    # Cada linha é comparada com a do hotel principal (5% mais barato = ameaça, 5% mais caro = seguro)
+    preco_principal = mn[indice_principal]
+    classes = np.zeros(mn.shape, dtype=np.int8)
+    classes[mn < preco_principal * 0.95] = 1
+    classes[mn > preco_principal * 1.05] = 2
+    classes[:, np.isnan(preco_principal)] = 3
+    classes[indice_principal] = 4
+    classes[np.isnan(mn)] = 5
+    return classes
+
+@st.cache_data(show_spinner=False, max_entries=MAX_ENTRADAS_CACHE_MATRIZ)
+def montar_matriz(_tarifas_matriz, hoteis_matriz, hotel_principal, data_inicio, data_fim, tarifas_sig):
+    """Monta o HTML da matriz comparativa e a matriz numérica de menores preços (hotéis x datas)"""
+    # _tarifas_matriz não entra na chave do cache; tarifas_sig representa o seu conteúdo
+    # Processar dados para a matriz (MANTENDO LÓGICA ATUAL)
+    # Agrupar por hotel e data, considerando múltiplas tarifas (menor e maior preço do dia)
+    # Eixo de datas do período com aritmética de datas do NumPy, na mesma resolução do _data_ts
+    dias = np.arange(np.datetime64(data_inicio, 'D'), np.datetime64(data_fim, 'D') + 1)
+    datas_periodo = pd.DatetimeIndex(dias.astype('datetime64[ns]'))
+    grp = _tarifas_matriz.groupby(['hotel', '_data_ts'], observed=True)['preco'].agg(['min', 'max']).unstack('_data_ts')
+    # Volta para float64 arredondando aos centavos, desfazendo o ruído do float32 na exibição e no gráfico
+    mn = grp['min'].reindex(index=hoteis_matriz, columns=datas_periodo).to_numpy(dtype=float).round(2)
+    mx = grp['max'].reindex(index=hoteis_matriz, columns=datas_periodo).to_numpy(dtype=float).round(2)
     
-    for _, row in df_excel.iterrows():
-        data = row['data']
-        preco = row['preco']
-        sequencia = row.get('sequencia', 1)
+    # Rótulos de exibição calculados uma vez; múltiplas tarifas com variação aparecem como "min→max"
+    tem_preco = ~np.isnan(mn)
+    variacao = mx > mn
+    mn_txt = np.rint(np.nan_to_num(mn)).astype(np.int64).astype(str)
+    mx_txt = np.rint(np.nan_to_num(mx)).astype(np.int64).astype(str)
+    rotulos = np.where(variacao, np.char.add(np.char.add(mn_txt, '→'), mx_txt), np.char.add('R$ ', mn_txt))
+    rotulos = np.where(tem_preco, rotulos, '-')
+    
+    # Os rótulos seguem como array para o HTML; só o menor preço vira DataFrame, usado pelo gráfico
+    df_num = pd.DataFrame(mn, index=hoteis_matriz, columns=datas_periodo)
+    
+    # Criar HTML da matriz com cores (MANTENDO LÓGICA ATUAL)
+    # Montado à mão (e não com pandas Styler) para manter exatamente a marcação e o layout atuais da tabela
+    partes = ["<table style='width:100%; border-collapse: collapse;'>"]
+    
+    # Cabeçalho
+    partes.append("<tr><th style='border: 1px solid #ddd; padding: 8px; background-color: #f2f2f2;'>Hotel</th>")
+    datas_fmt = datas_periodo.strftime('%d/%m')
+    partes.extend(f"<th style='border: 1px solid #ddd; padding: 8px; background-color: #f2f2f2; text-align: center;'>{data_str}</th>" for data_str in datas_fmt)
+    partes.append("</tr>")
+    
+    # Classe de cor de todas as células de uma vez
+    estilos = ESTILOS_CELULA_MATRIZ[classificar_precos(mn, hoteis_matriz.index(hotel_principal))]
+    
+    # Linhas dos hotéis
+    for i, hotel in enumerate(hoteis_matriz):
+        # Nome do hotel
+        if hotel == hotel_principal:
+            celula_hotel = f"<td style='border: 1px solid #ddd; padding: 8px; background-color: #FFF2CC; font-weight: bold; color: #B7950B;'>{hotel}</td>"
+        else:
+            celula_hotel = f"<td style='border: 1px solid #ddd; padding: 8px; font-weight: bold;'>{hotel}</td>"
         
-        cursor.execute("INSERT INTO tarifas (hotel, data, preco, sequencia) VALUES (?, ?, ?, ?)", 
-                       (hotel, data, preco, sequencia))
+        # Preços por data
+        celulas_precos = "".join(
+            f"<td style='{estilo}'>{rotulo}</td>"
+            for rotulo, estilo in zip(rotulos[i], estilos[i])
+        )
+        partes.append(f"<tr>{celula_hotel}{celulas_precos}</tr>")
     
-    conn.commit()
-    conn.close()
-    return len(df_excel)  # Retorna quantidade de tarifas importadas
+    partes.append("</table>")
+    html_matriz = "".join(partes)
+    return html_matriz, df_num
+
+@st.cache_data(show_spinner=False, max_entries=MAX_ENTRADAS_CACHE_MATRIZ)
+def construir_grafico_precos(_df_num, hoteis_matriz, hotel_principal, data_inicio, data_fim, tarifas_sig):
+    """Monta o gráfico de evolução de preços a partir da matriz numérica (hotéis x datas)"""
+    # Chave do cache pelas mesmas entradas da matriz; _df_num é derivado delas e não é hasheado
+    go, paleta = carregar_plotly()
+    
+    # Cores: laranja para o hotel principal e a paleta padrão do Plotly para os concorrentes, na ordem da matriz
+    cores = ['#FFA500' if hotel == hotel_principal else paleta[i % len(paleta)] for i, hotel in enumerate(_df_num.index)]
+    
+    # Uma linha por hotel com todos os dias do período; dias sem tarifa (NaN) ficam como lacunas.
+    # Os traços são montados de uma vez e entregues ao Figure em uma única chamada
+    tracos = [
+        go.Scatter(
+            x=_df_num.columns,
+            y=precos_hotel,
+            mode='lines+markers',
+            name=hotel,
+            line=dict(color=cor, width=4 if hotel == hotel_principal else 2),
+            marker=dict(size=6 if hotel == hotel_principal else 4),
+            connectgaps=False  # Não conecta lacunas (dias sem dados)
+        )
+        for hotel, precos_hotel, cor in zip(_df_num.index, _df_num.to_numpy(), cores)
+    ]
+    fig = go.Figure(data=tracos)
+    
+    # Configurar layout do gráfico
+    fig.update_layout(
+        title=f"Evolução de Preços - {hotel_principal} vs Concorrentes",
+        xaxis_title="Data",
+        yaxis_title="Preço (R$)",
+        height=400,
+        hovermode='x unified',
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        ),
+        xaxis=dict(
+            type='date',
+            dtick='D1',  # Força tick diário
+            tickformat='%d/%m',  # Formato dia/mês
+            tickangle=45,  # Rotaciona labels para melhor legibilidade
+            showgrid=True
+        )
+    )
+    
+    return fig
 
 # CSS customizado para aparência profissional (MANTENDO LAYOUT ATUAL)
 st.markdown("""
@@ -351,14 +621,10 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Inicializar banco de dados
-init_database()
-
 # Função para inserir dados iniciais se não existirem
 def inserir_dados_iniciais():
     """Insere dados iniciais se o banco estiver vazio"""
-    hoteis_df = listar_hoteis()
-    if len(hoteis_df) == 0:
+    if obter_conexao().execute("SELECT 1 FROM hoteis LIMIT 1").fetchone() is None:
         # Inserir hotéis iniciais
         hoteis_iniciais = [
             ("ECOENCANTO", "https://booking.com/ecoencanto"),
@@ -371,9 +637,6 @@ def inserir_dados_iniciais():
             ("LAGOA RESORT", "https://booking.com/lagoaresort")
         ]
         
-        for nome, url in hoteis_iniciais:
-            criar_hotel(nome, url)
-        
         # Inserir relacionamentos iniciais
         relacionamentos_iniciais = [
             ("ECOENCANTO", "VENICE HOTEL"),
@@ -384,11 +647,24 @@ def inserir_dados_iniciais():
             ("VENICE HOTEL", "POUSADA XPTO")
         ]
         
-        for principal, concorrente in relacionamentos_iniciais:
-            criar_relacionamento(principal, concorrente)
+        # Gravar hotéis e relacionamentos em uma única transação
+        with transacao() as conn:
+            conn.executemany("INSERT OR IGNORE INTO hoteis (nome, booking_url) VALUES (?, ?)", hoteis_iniciais)
+            conn.executemany("INSERT INTO relacionamentos (hotel_principal, concorrente) VALUES (?, ?)", relacionamentos_iniciais)
+        listar_hoteis_completo.clear()
+        listar_hoteis_nomes.clear()
+        listar_relacionamentos.clear()
+        obter_concorrentes.clear()
 
-# Inserir dados iniciais
-inserir_dados_iniciais()
+@st.cache_resource
+def preparar_banco():
+    """Cria as tabelas e insere os dados iniciais uma única vez por processo"""
+    init_database()
+    inserir_dados_iniciais()
+    return True
+
+# Inicializar banco de dados e dados iniciais
+preparar_banco()
 
 # Header principal (MANTENDO LAYOUT ATUAL)
 st.markdown("""
@@ -451,9 +727,9 @@ if pagina == "🏨 Cadastro de Hotéis":
     
     with col2:
         st.subheader("Remover Hotel")
-        hoteis_df = listar_hoteis()
-        if len(hoteis_df) > 0:
-            hotel_remover = st.selectbox("Selecione:", hoteis_df['nome'].tolist(), key="remover")
+        hoteis_lista = listar_hoteis_nomes()
+        if len(hoteis_lista) > 0:
+            hotel_remover = st.selectbox("Selecione:", hoteis_lista, key="remover")
             if st.button("🗑️ Remover", type="secondary"):
                 excluir_hotel(hotel_remover)
                 st.success(f"✅ Hotel '{hotel_remover}' removido!")
@@ -461,18 +737,22 @@ if pagina == "🏨 Cadastro de Hotéis":
     
     # Lista de hotéis cadastrados (MANTENDO LAYOUT ATUAL)
     st.subheader("Hotéis Cadastrados")
-    hoteis_df = listar_hoteis()
+    hoteis_df = listar_hoteis_completo()
     
     if len(hoteis_df) > 0:
         # Criar tabela HTML (mantendo formato atual)
-        html_table = "<table style='width:100%; border-collapse: collapse;'>"
-        html_table += "<tr style='background-color: #f2f2f2;'><th style='border: 1px solid #ddd; padding: 8px;'>🏨 Hotel</th><th style='border: 1px solid #ddd; padding: 8px;'>🔗 Link Booking</th></tr>"
-        
-        for _, row in hoteis_df.iterrows():
-            link_html = f'<a href="{row["booking_url"]}" target="_blank">{row["booking_url"]}</a>' if row["booking_url"] else "Não informado"
-            html_table += f"<tr><td style='border: 1px solid #ddd; padding: 8px;'>{row['nome']}</td><td style='border: 1px solid #ddd; padding: 8px;'>{link_html}</td></tr>"
-        
-        html_table += "</table>"
+        linhas_html = [
+            f"<tr><td style='border: 1px solid #ddd; padding: 8px;'>{nome}</td><td style='border: 1px solid #ddd; padding: 8px;'>"
+            + (f'<a href="{url}" target="_blank">{url}</a>' if url else "Não informado")
+            + "</td></tr>"
+            for nome, url in zip(hoteis_df['nome'].values, hoteis_df['booking_url'].values)
+        ]
+        html_table = (
+            "<table style='width:100%; border-collapse: collapse;'>"
+            "<tr style='background-color: #f2f2f2;'><th style='border: 1px solid #ddd; padding: 8px;'>🏨 Hotel</th><th style='border: 1px solid #ddd; padding: 8px;'>🔗 Link Booking</th></tr>"
+            + "".join(linhas_html)
+            + "</table>"
+        )
         st.markdown(html_table, unsafe_allow_html=True)
     else:
         st.info("📝 Nenhum hotel cadastrado ainda.")
@@ -481,11 +761,10 @@ if pagina == "🏨 Cadastro de Hotéis":
 elif pagina == "👥 Relacionamentos":
     st.header("👥 Relacionamento de Concorrentes")
     
-    hoteis_df = listar_hoteis()
-    if len(hoteis_df) == 0:
+    hoteis_lista = list(listar_hoteis_nomes())
+    if len(hoteis_lista) == 0:
         st.warning("⚠️ Cadastre hotéis primeiro!")
     else:
-        hoteis_lista = hoteis_df['nome'].tolist()
         
         col1, col2 = st.columns([2, 1])
         
@@ -504,16 +783,12 @@ elif pagina == "👥 Relacionamentos":
                 concorrentes_selecionados = st.multiselect(
                     f"Concorrentes de {hotel_principal}:",
                     hoteis_disponiveis,
-                    default=concorrentes_atuais
+                    default=[h for h in hoteis_disponiveis if h in concorrentes_atuais]
                 )
                 
                 if st.button("💾 Salvar Relacionamentos", type="primary"):
-                    # Excluir relacionamentos antigos
-                    excluir_relacionamentos(hotel_principal)
-                    
-                    # Criar novos relacionamentos
-                    for concorrente in concorrentes_selecionados:
-                        criar_relacionamento(hotel_principal, concorrente)
+                    # Substituir relacionamentos antigos pelos selecionados
+                    salvar_relacionamentos(hotel_principal, concorrentes_selecionados)
                     
                     st.success(f"✅ Relacionamentos salvos para {hotel_principal}!")
                     st.rerun()
@@ -522,7 +797,7 @@ elif pagina == "👥 Relacionamentos":
             st.subheader("Limpar")
             hotel_limpar = st.selectbox("Hotel:", hoteis_lista, key="limpar")
             if st.button("🗑️ Limpar Relacionamentos", type="secondary"):
-                excluir_relacionamentos(hotel_limpar)
+                salvar_relacionamentos(hotel_limpar, [])
                 st.success(f"✅ Relacionamentos de '{hotel_limpar}' removidos!")
                 st.rerun()
         
@@ -531,13 +806,17 @@ elif pagina == "👥 Relacionamentos":
         relacionamentos_df = listar_relacionamentos()
         
         if len(relacionamentos_df) > 0:
-            for _, row in relacionamentos_df.iterrows():
-                st.markdown(f"""
+            # Todos os cartões em um único st.markdown
+            cartoes_html = "".join(
+                f"""
                 <div class="metric-card">
-                    <strong>🏨 {row['hotel_principal']}</strong><br>
-                    <small>Concorrentes: {row['concorrentes']}</small>
+                    <strong>🏨 {principal}</strong><br>
+                    <small>Concorrentes: {concorrentes}</small>
                 </div>
-                """, unsafe_allow_html=True)
+                """
+                for principal, concorrentes in relacionamentos_df.itertuples(index=False, name=None)
+            )
+            st.markdown(cartoes_html, unsafe_allow_html=True)
         else:
             st.info("📝 Nenhum relacionamento configurado ainda.")
 
@@ -545,11 +824,10 @@ elif pagina == "👥 Relacionamentos":
 elif pagina == "💰 Gestão de Tarifas":
     st.header("💰 Gestão de Tarifas")
     
-    hoteis_df = listar_hoteis()
-    if len(hoteis_df) == 0:
+    hoteis_lista = list(listar_hoteis_nomes())
+    if len(hoteis_lista) == 0:
         st.warning("⚠️ Cadastre hotéis primeiro!")
     else:
-        hoteis_lista = hoteis_df['nome'].tolist()
         
         # Tabs para diferentes funcionalidades (MANTENDO LAYOUT ATUAL)
         tab1, tab2, tab3, tab4, tab5 = st.tabs(["➕ Adicionar Tarifa", "📤 Importar Excel", "📋 Visualizar Tarifas", "📦 Importações", "🗑️ Excluir"])
@@ -607,30 +885,31 @@ elif pagina == "💰 Gestão de Tarifas":
                     
                     # Processar formato específico da planilha do usuário
                     if len(df_excel.columns) == 3:
-                        # Renomear colunas para formato padrão
-                        df_processado = df_excel.copy()
-                        df_processado.columns = ['data_inicio', 'data_fim', 'preco']
-                        
-                        # Converter preços (formato brasileiro com vírgula)
-                        df_processado['preco'] = df_processado['preco'].astype(str).str.replace(',', '.').astype(float)
-                        
-                        # Usar data_inicio como data principal
-                        df_processado['data'] = pd.to_datetime(df_processado['data_inicio'], format='%d/%m/%Y').dt.date
-                        df_processado['sequencia'] = 1
+                        # Colunas: data_inicio | data_fim | preco - usar data_inicio como data principal
+                        datas = pd.to_datetime(df_excel.iloc[:, 0], format='%d/%m/%Y', cache=True).values.astype('datetime64[D]')
                         
-                        # Preparar DataFrame final para importação
-                        df_final = df_processado[['data', 'preco', 'sequencia']].copy()
-                        
-                        st.write("📊 Dados processados:")
-                        st.dataframe(df_final.head())
-                        
-                        if titulo_importacao and st.button("🚀 Importar Tarifas", type="primary"):
-                            try:
-                                qtd_importadas = importar_tarifas_excel(hotel_importar, df_final, titulo_importacao)
-                                st.success(f"✅ {qtd_importadas} tarifas importadas para {hotel_importar}!")
-                                st.rerun()
-                            except Exception as e:
-                                st.error(f"❌ Erro ao importar: {str(e)}")
+                        # Datas vazias viram NaT; nenhuma tarifa é importada sem data válida
+                        sem_data = np.isnat(datas)
+                        if sem_data.any():
+                            linhas_sem_data = ", ".join(str(linha) for linha in np.flatnonzero(sem_data) + 2)
+                            st.error(f"❌ Data de início vazia ou inválida nas linhas: {linhas_sem_data}")
+                        else:
+                            datas = datas.astype(str)
+                            
+                            # Converter preços (formato brasileiro com vírgula)
+                            precos = df_excel.iloc[:, 2].astype(str).str.replace(',', '.').astype(float).to_numpy()
+                            sequencias = np.ones(len(df_excel), dtype=np.int64)
+                            
+                            st.write("📊 Dados processados:")
+                            st.dataframe(pd.DataFrame({'data': datas[:5], 'preco': precos[:5], 'sequencia': sequencias[:5]}))
+                            
+                            if titulo_importacao and st.button("🚀 Importar Tarifas", type="primary"):
+                                try:
+                                    qtd_importadas = importar_tarifas_excel(hotel_importar, datas, precos, sequencias, titulo_importacao)
+                                    st.success(f"✅ {qtd_importadas} tarifas importadas para {hotel_importar}!")
+                                    st.rerun()
+                                except Exception as e:
+                                    st.error(f"❌ Erro ao importar: {str(e)}")
                     else:
                         st.error(f"❌ Formato incorreto! Esperado 3 colunas, encontrado {len(df_excel.columns)}")
                 
@@ -641,13 +920,23 @@ elif pagina == "💰 Gestão de Tarifas":
             st.subheader("📋 Tarifas Cadastradas")
             
             hotel_visualizar = st.selectbox("Filtrar por Hotel:", ["Todos"] + hoteis_lista, key="visualizar")
+            hotel_filtro = None if hotel_visualizar == "Todos" else hotel_visualizar
             
-            if hotel_visualizar == "Todos":
-                tarifas_df = listar_tarifas()
-            else:
-                tarifas_df = listar_tarifas_por_hotel(hotel_visualizar)
+            total_tarifas, preco_medio, preco_min, preco_max = estatisticas_tarifas(hotel_filtro)
             
-            if len(tarifas_df) > 0:
+            if total_tarifas > 0:
+                # Carregar apenas a página selecionada
+                total_paginas = (total_tarifas - 1) // TARIFAS_POR_PAGINA + 1
+                pagina_tarifas = 1
+                if total_paginas > 1:
+                    pagina_tarifas = st.number_input("Página:", min_value=1, max_value=total_paginas, value=1, step=1)
+                offset = (pagina_tarifas - 1) * TARIFAS_POR_PAGINA
+                
+                if hotel_filtro:
+                    tarifas_df = listar_tarifas_por_hotel(hotel_filtro, TARIFAS_POR_PAGINA, offset)
+                else:
+                    tarifas_df = listar_tarifas(TARIFAS_POR_PAGINA, offset)
+                
                 # Preparar dados para exibição
                 df_display = tarifas_df.copy()
                 df_display['data'] = pd.to_datetime(df_display['data']).dt.strftime('%d/%m/%Y')
@@ -660,24 +949,23 @@ elif pagina == "💰 Gestão de Tarifas":
                 })
                 
                 st.dataframe(df_display, use_container_width=True)
+                if total_paginas > 1:
+                    st.caption(f"Exibindo {offset + 1} a {offset + len(tarifas_df)} de {total_tarifas} tarifas")
                 
                 # Estatísticas
                 st.subheader("📊 Estatísticas")
                 col1, col2, col3, col4 = st.columns(4)
                 
                 with col1:
-                    st.metric("Total de Registros", len(tarifas_df))
+                    st.metric("Total de Registros", total_tarifas)
                 
                 with col2:
-                    preco_medio = tarifas_df['preco'].mean()
                     st.metric("Preço Médio", f"R$ {preco_medio:.2f}")
                 
                 with col3:
-                    preco_min = tarifas_df['preco'].min()
                     st.metric("Menor Preço", f"R$ {preco_min:.2f}")
                 
                 with col4:
-                    preco_max = tarifas_df['preco'].max()
                     st.metric("Maior Preço", f"R$ {preco_max:.2f}")
             else:
                 st.info("📝 Nenhuma tarifa cadastrada ainda.")
@@ -704,14 +992,18 @@ elif pagina == "💰 Gestão de Tarifas":
                 
                 st.write(f"**Importações Realizadas ({len(importacoes_filtradas)} de {len(importacoes_df)}):**")
                 
-                for _, row in importacoes_filtradas.iterrows():
+                # Formatar as datas de uma vez e percorrer registros simples
+                importacoes_registros = importacoes_filtradas.assign(
+                    data_formatada=pd.to_datetime(importacoes_filtradas['data_importacao']).dt.strftime('%d/%m/%Y %H:%M')
+                ).to_dict('records')
+                
+                for row in importacoes_registros:
                     col1, col2 = st.columns([3, 1])
                     
                     with col1:
-                        data_formatada = pd.to_datetime(row['data_importacao']).strftime('%d/%m/%Y %H:%M')
                         st.markdown(f"""
                         **📦 {row['titulo']}**  
-                        Hotel: {row['hotel']} | Data: {data_formatada} | Registros: {row['total_registros']}
+                        Hotel: {row['hotel']} | Data: {row['data_formatada']} | Registros: {row['total_registros']}
                         """)
                     
                     with col2:
@@ -735,18 +1027,14 @@ elif pagina == "💰 Gestão de Tarifas":
             with col1:
                 if st.button("🧹 LIMPAR TODAS AS TARIFAS", type="primary"):
                     try:
-                        conn = sqlite3.connect(DB_FILE)
-                        cursor = conn.cursor()
-                        cursor.execute("DELETE FROM tarifas")
-                        conn.commit()
-                        conn.close()
+                        excluir_todas_tarifas()
                         st.success("✅ Todas as tarifas foram excluídas com sucesso!")
                         st.rerun()
                     except Exception as e:
                         st.error(f"❌ Erro ao limpar tarifas: {str(e)}")
             
             with col2:
-                tarifas_count = len(listar_tarifas())
+                tarifas_count = estatisticas_tarifas()[0]
                 st.metric("Total de Tarifas", tarifas_count)
             
             st.divider()
@@ -754,24 +1042,35 @@ elif pagina == "💰 Gestão de Tarifas":
             # Seção para excluir tarifas individuais
             st.markdown("### 🎯 Exclusão Individual")
             
-            tarifas_df = listar_tarifas()
-            if len(tarifas_df) > 0:
-                # Criar lista de opções para o dropdown
-                opcoes_tarifas = []
-                for _, row in tarifas_df.iterrows():
-                    data_formatada = pd.to_datetime(row['data']).strftime('%d/%m/%Y')
-                    opcao = f"{row['hotel']} - {data_formatada} - R$ {row['preco']:.2f} (Seq: {row['sequencia']})"
-                    opcoes_tarifas.append((opcao, row['id']))
+            hotel_exclusao = st.selectbox("Hotel:", hoteis_lista, key="exclusao_individual")
+            total_hotel = estatisticas_tarifas(hotel_exclusao)[0]
+            
+            if total_hotel > 0:
+                # Carregar apenas uma página de tarifas do hotel selecionado
+                total_paginas = (total_hotel - 1) // TARIFAS_POR_PAGINA_EXCLUSAO + 1
+                pagina_exclusao = 1
+                if total_paginas > 1:
+                    pagina_exclusao = st.number_input("Página de tarifas:", min_value=1, max_value=total_paginas, value=1, step=1)
+                tarifas_df = listar_tarifas_por_hotel(
+                    hotel_exclusao, TARIFAS_POR_PAGINA_EXCLUSAO, (pagina_exclusao - 1) * TARIFAS_POR_PAGINA_EXCLUSAO
+                )
+                
+                # Criar rótulos das opções para o dropdown
+                rotulos = (
+                    tarifas_df['hotel'] + " - "
+                    + pd.to_datetime(tarifas_df['data']).dt.strftime('%d/%m/%Y')
+                    + " - R$ " + tarifas_df['preco'].map('{:.2f}'.format)
+                    + " (Seq: " + tarifas_df['sequencia'].astype(str) + ")"
+                )
+                opcoes_tarifas = dict(zip(rotulos.tolist(), tarifas_df['id'].tolist()))
                 
                 tarifa_selecionada = st.selectbox(
                     "Selecione a tarifa para excluir:",
-                    options=[opcao[0] for opcao in opcoes_tarifas]
+                    options=list(opcoes_tarifas)
                 )
                 
                 if st.button("🗑️ Excluir Tarifa Selecionada", type="secondary"):
-                    # Encontrar o ID da tarifa selecionada
-                    tarifa_id = next(opcao[1] for opcao in opcoes_tarifas if opcao[0] == tarifa_selecionada)
-                    excluir_tarifa(tarifa_id)
+                    excluir_tarifa(opcoes_tarifas[tarifa_selecionada])
                     st.success("✅ Tarifa excluída com sucesso!")
                     st.rerun()
             else:
@@ -781,10 +1080,10 @@ elif pagina == "💰 Gestão de Tarifas":
 elif pagina == "📊 Matriz Comparativa":
     st.header("📊 Matriz Comparativa de Preços")
     
-    hoteis_df = listar_hoteis()
-    tarifas_df = listar_tarifas()
+    hoteis_lista = listar_hoteis_nomes()
+    tarifas_df, versao_tarifas = carregar_tarifas()
     
-    if len(hoteis_df) == 0:
+    if len(hoteis_lista) == 0:
         st.warning("⚠️ Cadastre hotéis primeiro!")
     elif len(tarifas_df) == 0:
         st.warning("⚠️ Cadastre tarifas primeiro!")
@@ -793,7 +1092,7 @@ elif pagina == "📊 Matriz Comparativa":
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            hotel_principal = st.selectbox("🏨 Hotel Principal:", hoteis_df['nome'].tolist())
+            hotel_principal = st.selectbox("🏨 Hotel Principal:", hoteis_lista)
         
         with col2:
             data_inicio = st.date_input("📅 Data Início:", value=datetime.now().date())
@@ -805,11 +1104,11 @@ elif pagina == "📊 Matriz Comparativa":
         if data_inicio and data_fim and data_inicio > data_fim:
             st.error("❌ Data de início deve ser anterior à data de fim!")
         elif data_inicio and data_fim:
-            # Filtrar tarifas do período
-            tarifas_periodo = tarifas_df[
-                (pd.to_datetime(tarifas_df['data']).dt.date >= data_inicio) &
-                (pd.to_datetime(tarifas_df['data']).dt.date <= data_fim)
-            ].copy()
+            # Recortar as tarifas do período por busca binária sobre as datas já ordenadas
+            ini = pd.Timestamp(data_inicio)
+            fim = pd.Timestamp(data_fim) + pd.Timedelta(days=1)
+            pos_ini, pos_fim = tarifas_df['_data_ts'].searchsorted([ini, fim])
+            tarifas_periodo = tarifas_df.iloc[pos_ini:pos_fim]
             
             if len(tarifas_periodo) == 0:
                 st.warning("⚠️ Nenhuma tarifa encontrada no período selecionado!")
@@ -818,128 +1117,20 @@ elif pagina == "📊 Matriz Comparativa":
                 concorrentes = obter_concorrentes(hotel_principal)
                 
                 # Incluir o hotel principal na lista
-                hoteis_matriz = [hotel_principal] + concorrentes
+                hoteis_matriz = [hotel_principal] + sorted(concorrentes)
                 
                 # Filtrar tarifas apenas dos hotéis relevantes
-                tarifas_matriz = tarifas_periodo[tarifas_periodo['hotel'].isin(hoteis_matriz)].copy()
+                tarifas_matriz = tarifas_periodo[tarifas_periodo['hotel'].isin(hoteis_matriz)]
                 
                 if len(tarifas_matriz) == 0:
                     st.warning("⚠️ Nenhuma tarifa encontrada para os hotéis selecionados no período!")
                 else:
-                    # Processar dados para a matriz (MANTENDO LÓGICA ATUAL)
-                    tarifas_matriz['data'] = pd.to_datetime(tarifas_matriz['data']).dt.date
-                    
-                    # Agrupar por hotel e data, considerando múltiplas tarifas
-                    matriz_dados = {}
-                    
-                    for hotel in hoteis_matriz:
-                        matriz_dados[hotel] = {}
-                        tarifas_hotel = tarifas_matriz[tarifas_matriz['hotel'] == hotel]
-                        
-                        for data in pd.date_range(data_inicio, data_fim).date:
-                            tarifas_data = tarifas_hotel[tarifas_hotel['data'] == data]
-                            
-                            if len(tarifas_data) == 0:
-                                matriz_dados[hotel][data] = None
-                            elif len(tarifas_data) == 1:
-                                matriz_dados[hotel][data] = tarifas_data.iloc[0]['preco']
-                            else:
-                                # Múltiplas tarifas - mostrar variação
-                                precos = tarifas_data['preco'].tolist()
-                                preco_min = min(precos)
-                                preco_max = max(precos)
-                                variacao_pct = ((preco_max - preco_min) / preco_min) * 100
-                                
-                                if variacao_pct > 0:
-                                    matriz_dados[hotel][data] = f"{preco_min:.0f}→{preco_max:.0f}"
-                                else:
-                                    matriz_dados[hotel][data] = preco_min
-                    
-                    # Criar DataFrame da matriz
-                    datas_periodo = pd.date_range(data_inicio, data_fim).date
-                    df_matriz = pd.DataFrame(index=hoteis_matriz, columns=datas_periodo)
-                    
-                    for hotel in hoteis_matriz:
-                        for data in datas_periodo:
-                            df_matriz.loc[hotel, data] = matriz_dados[hotel][data]
-                    
                     # Exibir matriz (MANTENDO LAYOUT ATUAL)
                     st.subheader(f"🎯 Análise Competitiva - {hotel_principal}")
                     
-                    # Criar HTML da matriz com cores (MANTENDO LÓGICA ATUAL)
-                    html_matriz = "<table style='width:100%; border-collapse: collapse;'>"
-                    
-                    # Cabeçalho
-                    html_matriz += "<tr><th style='border: 1px solid #ddd; padding: 8px; background-color: #f2f2f2;'>Hotel</th>"
-                    for data in datas_periodo:
-                        data_str = data.strftime('%d/%m')
-                        html_matriz += f"<th style='border: 1px solid #ddd; padding: 8px; background-color: #f2f2f2; text-align: center;'>{data_str}</th>"
-                    html_matriz += "</tr>"
-                    
-                    # Linhas dos hotéis
-                    for hotel in hoteis_matriz:
-                        html_matriz += "<tr>"
-                        
-                        # Nome do hotel
-                        if hotel == hotel_principal:
-                            html_matriz += f"<td style='border: 1px solid #ddd; padding: 8px; background-color: #FFF2CC; font-weight: bold; color: #B7950B;'>{hotel}</td>"
-                        else:
-                            html_matriz += f"<td style='border: 1px solid #ddd; padding: 8px; font-weight: bold;'>{hotel}</td>"
-                        
-                        # Preços por data
-                        for data in datas_periodo:
-                            valor = df_matriz.loc[hotel, data]
-                            
-                            if valor is None or pd.isna(valor):
-                                html_matriz += "<td style='border: 1px solid #ddd; padding: 8px; text-align: center; color: #999;'>-</td>"
-                            else:
-                                if hotel == hotel_principal:
-                                    # Hotel principal sempre em amarelo
-                                    if isinstance(valor, str) and '→' in valor:
-                                        html_matriz += f"<td style='border: 1px solid #ddd; padding: 8px; text-align: center; background-color: #FFF2CC; font-weight: bold; color: #B7950B;'>{valor}</td>"
-                                    else:
-                                        html_matriz += f"<td style='border: 1px solid #ddd; padding: 8px; text-align: center; background-color: #FFF2CC; font-weight: bold; color: #B7950B;'>R$ {valor:.0f}</td>"
-                                else:
-                                    # Concorrentes - comparar com hotel principal
-                                    valor_principal = df_matriz.loc[hotel_principal, data]
-                                    
-                                    if valor_principal is not None and not pd.isna(valor_principal):
-                                        # Extrair valor numérico do hotel principal
-                                        if isinstance(valor_principal, str) and '→' in valor_principal:
-                                            valor_principal_num = float(valor_principal.split('→')[0])
-                                        else:
-                                            valor_principal_num = float(valor_principal)
-                                        
-                                        # Extrair valor numérico do concorrente
-                                        if isinstance(valor, str) and '→' in valor:
-                                            valor_concorrente_num = float(valor.split('→')[0])
-                                        else:
-                                            valor_concorrente_num = float(valor)
-                                        
-                                        # Determinar cor baseada na comparação
-                                        if valor_concorrente_num < valor_principal_num * 0.95:  # 5% mais barato
-                                            cor_fundo = "#FFCDD2"  # Vermelho - AMEAÇA
-                                            cor_texto = "#B71C1C"
-                                        elif valor_concorrente_num > valor_principal_num * 1.05:  # 5% mais caro
-                                            cor_fundo = "#C8E6C9"  # Verde - SEGURO
-                                            cor_texto = "#1B5E20"
-                                        else:
-                                            cor_fundo = "#F5F5F5"  # Cinza - NEUTRO
-                                            cor_texto = "#424242"
-                                        
-                                        if isinstance(valor, str) and '→' in valor:
-                                            html_matriz += f"<td style='border: 1px solid #ddd; padding: 8px; text-align: center; background-color: {cor_fundo}; color: {cor_texto}; font-weight: bold;'>{valor}</td>"
-                                        else:
-                                            html_matriz += f"<td style='border: 1px solid #ddd; padding: 8px; text-align: center; background-color: {cor_fundo}; color: {cor_texto}; font-weight: bold;'>R$ {valor:.0f}</td>"
-                                    else:
-                                        if isinstance(valor, str) and '→' in valor:
-                                            html_matriz += f"<td style='border: 1px solid #ddd; padding: 8px; text-align: center;'>{valor}</td>"
-                                        else:
-                                            html_matriz += f"<td style='border: 1px solid #ddd; padding: 8px; text-align: center;'>R$ {valor:.0f}</td>"
-                        
-                        html_matriz += "</tr>"
-                    
-                    html_matriz += "</table>"
+                    # Assinatura das tarifas do período sem percorrer as linhas: versão da carga + fatia do período
+                    tarifas_sig = (versao_tarifas, pos_ini, pos_fim)
+                    html_matriz, df_num = montar_matriz(tarifas_matriz, hoteis_matriz, hotel_principal, data_inicio, data_fim, tarifas_sig)
                     
                     # Adicionar scroll horizontal APENAS na tabela
                     st.markdown(f"""
@@ -962,77 +1153,7 @@ elif pagina == "📊 Matriz Comparativa":
                     st.subheader("📈 Evolução dos Preços")
                     
                     # Preparar dados para o gráfico
-                    import plotly.graph_objects as go
-                    from plotly.subplots import make_subplots
-                    
-                    fig = go.Figure()
-                    
-                    # Cores para cada hotel
-                    cores_hoteis = {
-                        hotel_principal: '#FFA500',  # Laranja para hotel principal
-                        'VENICE HOTEL': '#FF6B6B',   # Vermelho
-                        'GRAND PLAZA': '#4ECDC4',    # Azul claro
-                        'Mirante da Lagoinha': '#45B7D1',  # Azul
-                        'Hotel Teste Persistência': '#96CEB4',  # Verde claro
-                        'Hotel Teste SQLite': '#FFEAA7'  # Amarelo claro
-                    }
-                    
-                    for hotel in hoteis_matriz:
-                        precos_hotel = []
-                        datas_hotel = []
-                        
-                        # Incluir TODOS os dias do período (dia a dia)
-                        for data in datas_periodo:
-                            valor = df_matriz.loc[hotel, data]
-                            datas_hotel.append(data)
-                            
-                            if valor is not None and not pd.isna(valor):
-                                # Extrair valor numérico
-                                if isinstance(valor, str) and '→' in valor:
-                                    valor_num = float(valor.split('→')[0])
-                                else:
-                                    valor_num = float(valor)
-                                precos_hotel.append(valor_num)
-                            else:
-                                # Para dias sem dados, usar None (cria lacuna na linha)
-                                precos_hotel.append(None)
-                        
-                        # Sempre adiciona a linha (mesmo com lacunas)
-                        cor = cores_hoteis.get(hotel, '#95A5A6')
-                        largura = 4 if hotel == hotel_principal else 2
-                        
-                        fig.add_trace(go.Scatter(
-                            x=datas_hotel,
-                            y=precos_hotel,
-                            mode='lines+markers',
-                            name=hotel,
-                            line=dict(color=cor, width=largura),
-                            marker=dict(size=6 if hotel == hotel_principal else 4),
-                            connectgaps=False  # Não conecta lacunas (dias sem dados)
-                        ))
-                    
-                    # Configurar layout do gráfico
-                    fig.update_layout(
-                        title=f"Evolução de Preços - {hotel_principal} vs Concorrentes",
-                        xaxis_title="Data",
-                        yaxis_title="Preço (R$)",
-                        height=400,
-                        hovermode='x unified',
-                        legend=dict(
-                            orientation="h",
-                            yanchor="bottom",
-                            y=1.02,
-                            xanchor="right",
-                            x=1
-                        ),
-                        xaxis=dict(
-                            type='date',
-                            dtick='D1',  # Força tick diário
-                            tickformat='%d/%m',  # Formato dia/mês
-                            tickangle=45,  # Rotaciona labels para melhor legibilidade
-                            showgrid=True
-                        )
-                    )
+                    fig = construir_grafico_precos(df_num, hoteis_matriz, hotel_principal, data_inicio, data_fim, tarifas_sig)
                     
                     # Exibir gráfico
                     st.plotly_chart(fig, use_container_width=True)